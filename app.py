@@ -1,38 +1,452 @@
 # /paddle-ocr-webapp/app.py
 
 import os
-import uuid
+# Paddle reads FLAGS_* from the environment when it is first imported, so set them before the imports below.
+# Exhaustive cuDNN algorithm search is off by default in Paddle; it is pinned off here because OCR inputs
+# change size with every image, so an inherited FLAGS_cudnn_exhaustive_search=1 would re-benchmark the
+# convolutions on almost every call.
+os.environ['FLAGS_cudnn_exhaustive_search'] = '0'
+# The CPU math libraries (MKL-DNN / OpenMP) read their thread settings when loaded, too. One core is left
+# for the web server and image decoding; gunicorn.conf.py sets a smaller per-worker share so several
+# workers don't oversubscribe the machine.
+CPU_THREADS = int(os.environ.setdefault('OMP_NUM_THREADS', str(max(1, (os.cpu_count() or 1) - 1))))
+os.environ.setdefault('MKL_NUM_THREADS', str(CPU_THREADS))
+os.environ.setdefault('KMP_AFFINITY', 'granularity=fine,compact,1,0')
+import collections
+import gc
+import queue
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from cachetools import LRUCache
+import xxhash
 from flask import Flask, request, jsonify, render_template
 from flask_cors import CORS
+from werkzeug.sansio.multipart import MultipartDecoder, NeedData, File, Field, Data, Epilogue
+import paddle
 from paddleocr import PaddleOCR
 import cv2 # Import OpenCV
 import numpy as np # Import NumPy
 
 # --- Configuration ---
-# Define the folder to store uploaded images temporarily
-UPLOAD_FOLDER = 'uploads'
-# Define allowed file extensions
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
+# Allowed image types, recognized by their leading "magic" bytes rather than the client-supplied filename
+JPEG_SIGNATURE = b'\xff\xd8\xff'
+PNG_SIGNATURE = b'\x89PNG'
+
+def env_flag(name, default='0'):
+    """Reads a boolean switch from the environment (1/true/yes/on)."""
+    return os.environ.get(name, default).strip().lower() in ('1', 'true', 'yes', 'on')
+
+# Flask debug mode (tracebacks + auto-reload) for `python app.py` only; off by default.
+DEBUG = env_flag('FLASK_DEBUG')
+# In debug mode the Werkzeug reloader re-runs this script in a child process (WERKZEUG_RUN_MAIN=true)
+# that actually serves requests; the watching parent never does, so it skips loading the models.
+IS_RELOADER_PARENT = __name__ == '__main__' and DEBUG and os.environ.get('WERKZEUG_RUN_MAIN') != 'true'
+# Run on the GPU only when Paddle was built with CUDA and a device is actually present.
+USE_GPU = paddle.device.is_compiled_with_cuda() and paddle.device.cuda.device_count() > 0
+# Run the det/rec networks through Paddle-TensorRT (GPU only).
+# The first start records the input shape ranges next to the model files; later starts reuse them.
+USE_TENSORRT = env_flag('PADDLE_USE_TENSORRT')
+# TensorRT precision: 'fp16', or 'int8' for quantized (PTQ/QAT) models. INT8 Tensor Cores roughly
+# double FP16 throughput, but need quantized weights. PaddleOCR applies one precision to both
+# networks, so int8 falls back to fp16 unless quantized detection and recognition models are
+# provided through PADDLE_DET_MODEL_DIR and PADDLE_REC_MODEL_DIR.
+TRT_PRECISION = os.environ.get('PADDLE_TRT_PRECISION', 'fp16').strip().lower()
+# Optional custom (e.g. quantized) inference models; PaddleOCR's downloaded ones are used otherwise.
+DET_MODEL_DIR = os.environ.get('PADDLE_DET_MODEL_DIR')
+REC_MODEL_DIR = os.environ.get('PADDLE_REC_MODEL_DIR')
+# Number of text crops the recognizer processes per forward pass.
+REC_BATCH_SIZE = 32
+# Longest image side the detector works at (limit type 'max': larger images are scaled down to it).
+# Raised from PaddleOCR's default of 960 so large scans keep more detail.
+DET_LIMIT_SIDE_LEN = 1280
+# Input height of the English PP-OCR recognizer and the widths crops are padded to.
+# Every recognition batch then has one of a handful of fixed shapes, so TensorRT profiles and
+# cuDNN algorithm choices are reused instead of being re-tuned for each new crop width.
+# 320 is the recognizer's minimum input width; the largest bucket fits a full-width line of a
+# document page, and longer crops are squeezed into it.
+REC_IMAGE_HEIGHT = 48
+REC_WIDTH_BUCKETS = (320, 480, 640, 960, 1280, 1600, 2400, 3200)
+# Threads that decode uploaded images while the model works on earlier ones.
+DECODE_WORKERS = 4
+# Largest grayscale scratch buffer (in pixels, 4K UHD) kept for reuse by the augmented variant.
+# Bigger uploads get a one-off buffer, so a single huge image doesn't stay allocated for good.
+GRAY_BUFFER_MAX_PIXELS = 3840 * 2160
+# Number of OCR texts remembered per worker, keyed by a hash of the uploaded bytes.
+# Repeated uploads (templates, forms, client retries) skip inference entirely.
+RESULT_CACHE_SIZE = 1024
+# Batch uploads are parsed as they arrive: reads of this size are pulled off the request body, and at
+# most this many received files wait for the model before reading pauses.
+UPLOAD_CHUNK_SIZE = 64 * 1024
+UPLOAD_QUEUE_SIZE = 8
+# Independent PaddleOCR engines per worker process, each with its own predictors. With 2 or more, one
+# engine's pre- and post-processing (resizing, box extraction, CTC decoding) runs while another is
+# inferring. On the GPU, PaddleOCR doesn't give predictors their own CUDA stream, so the kernels of all
+# engines still queue on the device's shared stream; on the CPU, the engines split CPU_THREADS.
+# Every engine holds its own copy of the models.
+OCR_ENGINES = max(1, int(os.environ.get('PADDLE_OCR_ENGINES', '1')))
+# Images of one request that are queued for or in detection at a time. Only their crops are kept
+# afterwards, so a large batch doesn't hold every decoded image in memory at once, and reading the
+# upload pauses (UPLOAD_QUEUE_SIZE) while the engines are busy.
+DETECTIONS_IN_FLIGHT = 2 * OCR_ENGINES
 
 # --- App Initialization ---
 app = Flask(__name__)
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 CORS(app)  # Enable Cross-Origin Resource Sharing
+# JPEG/PNG decoding releases the GIL, so it overlaps with inference.
+decode_pool = ThreadPoolExecutor(max_workers=DECODE_WORKERS)
+# Detection / recognition calls, one thread per engine.
+inference_pool = ThreadPoolExecutor(max_workers=OCR_ENGINES)
+# PaddleOCR predictors are not thread-safe: an engine serves one call at a time and is handed out
+# through this queue, so threaded servers (gunicorn gthread) take turns on the models.
+idle_engines = queue.SimpleQueue()
+# Formatted OCR text by (image hash, variant). cachetools caches are not thread-safe either.
+result_cache = LRUCache(maxsize=RESULT_CACHE_SIZE)
+cache_lock = threading.Lock()
+# Grayscale scratch buffers for the augmented variant, reused across requests instead of
+# allocating (and freeing) a full-size image per file. Buffers grow up to GRAY_BUFFER_MAX_PIXELS.
+gray_buffers = queue.SimpleQueue()
 
 # --- Global Model Initialization ---
 # Initialize PaddleOCR. This is done once globally to avoid reloading the model on each request.
 # The model files will be downloaded automatically on the first run.
-print("Initializing PaddleOCR... This may take a moment on the first run.")
+print(f"Initializing PaddleOCR on {'GPU' if USE_GPU else 'CPU'}... This may take a moment on the first run.")
 # Using use_angle_cls=False to match the notebook's behavior where the angle classifier was not used.
 # Set show_log=False to keep the console clean.
-ocr_model = PaddleOCR(lang='en', use_angle_cls=False, show_log=False)
+# Detector: det_db_box_thresh is lowered from PaddleOCR's default of 0.6 to keep faint text boxes;
+# det_limit_type and det_db_thresh restate the defaults.
+ocr_options = {'lang': 'en', 'use_angle_cls': False, 'show_log': False, 'rec_batch_num': REC_BATCH_SIZE,
+               'det_limit_side_len': DET_LIMIT_SIDE_LEN, 'det_limit_type': 'max',
+               'det_db_thresh': 0.3, 'det_db_box_thresh': 0.5, 'use_gpu': USE_GPU}
+if not USE_GPU:
+    # CPU inference is memory-bound on the conv weights: use the MKL-DNN kernels on the pinned threads,
+    # shared out between the engines so they don't oversubscribe the worker's cores
+    ocr_options.update(enable_mkldnn=True, cpu_threads=max(1, CPU_THREADS // OCR_ENGINES))
+if DET_MODEL_DIR:
+    ocr_options['det_model_dir'] = DET_MODEL_DIR
+if REC_MODEL_DIR:
+    ocr_options['rec_model_dir'] = REC_MODEL_DIR
+if USE_TENSORRT and USE_GPU:
+    trt_precision = TRT_PRECISION
+    if trt_precision not in ('fp16', 'int8'):
+        # PaddleOCR would silently run anything else at FP32
+        print(f"Unknown PADDLE_TRT_PRECISION={TRT_PRECISION!r} (expected fp16 or int8); using fp16.")
+        trt_precision = 'fp16'
+    elif trt_precision == 'int8' and not all(model_dir and os.path.isdir(model_dir)
+                                             for model_dir in (DET_MODEL_DIR, REC_MODEL_DIR)):
+        print("PADDLE_TRT_PRECISION=int8 needs quantized models in PADDLE_DET_MODEL_DIR and "
+              "PADDLE_REC_MODEL_DIR; using fp16.")
+        trt_precision = 'fp16'
+    ocr_options.update(use_tensorrt=True, precision=trt_precision)
+
+def warm_up(engine):
+    """
+    Runs the detector and the recognizer once over every input shape requests can produce,
+    so the first request doesn't pay for engine building / memory allocation.
+    With TensorRT, the shape ranges recorded on the very first start come from this run.
+    """
+    # Detector inputs are scaled to multiples of 32, at most DET_LIMIT_SIDE_LEN on the long side
+    for side in (32, DET_LIMIT_SIDE_LEN):
+        engine.ocr(np.zeros((side, side, 3), dtype=np.uint8), rec=False, cls=False)
+    # Recognizer inputs: every width bucket, alone and as a full batch. fit_to_width_bucket never
+    # produces anything wider than the largest one.
+    for width in REC_WIDTH_BUCKETS:
+        crop = np.zeros((REC_IMAGE_HEIGHT, width, 3), dtype=np.uint8)
+        for batch_size in (1, REC_BATCH_SIZE):
+            engine.ocr([crop] * batch_size, det=False, cls=False)
+
+def trt_shape_files(engine):
+    """The TensorRT shape range files PaddleOCR keeps next to the detection / recognition models."""
+    args = engine.text_detector.args
+    return (os.path.join(args.det_model_dir, 'det_trt_dynamic_shape.txt'),
+            os.path.join(args.rec_model_dir, 'rec_trt_dynamic_shape.txt'))
+
+def create_engines():
+    """Builds the OCR_ENGINES PaddleOCR engines of this process."""
+    if not (USE_TENSORRT and USE_GPU):
+        return [PaddleOCR(**ocr_options) for _ in range(OCR_ENGINES)]
+    import fcntl  # TensorRT deployments are Linux-only
+    # PaddleOCR records the shape ranges when a shape file is missing, and Paddle writes the file when
+    # that predictor is destroyed. Gunicorn workers start together: one at a time goes through here,
+    # so a single worker records the files and the others load them.
+    with open(os.path.join(tempfile.gettempdir(), 'paddleocr_trt_shapes.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        engine = PaddleOCR(**ocr_options)
+        if not all(os.path.exists(path) for path in trt_shape_files(engine)):
+            warm_up(engine)
+            del engine
+            gc.collect()
+            engine = PaddleOCR(**ocr_options)
+    return [engine] + [PaddleOCR(**ocr_options) for _ in range(OCR_ENGINES - 1)]
+
+ocr_engines = [] if IS_RELOADER_PARENT else create_engines()
+for engine in ocr_engines:
+    warm_up(engine)
+    idle_engines.put(engine)
 print("PaddleOCR Initialized Successfully.")
 
 # --- Helper Functions ---
-def allowed_file(filename):
-    """Checks if the uploaded file has an allowed extension."""
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+@contextmanager
+def ocr_engine():
+    """Borrows an idle PaddleOCR engine for the duration of one call."""
+    engine = idle_engines.get()
+    try:
+        yield engine
+    finally:
+        idle_engines.put(engine)
+
+def run_model(img, **kwargs):
+    """Calls PaddleOCR on whichever engine is idle."""
+    # cls=False is passed explicitly: PaddleOCR defaults to cls=True and warns on every call
+    # when the angle classifier isn't loaded
+    with ocr_engine() as engine:
+        return engine.ocr(img, cls=False, **kwargs)
+
+def detect_text_boxes(img):
+    """Runs text detection only and returns the list of boxes (empty if none)."""
+    # Returns [boxes] or [None] when the page is empty
+    return run_model(img, rec=False)[0] or []
+
+def cache_get(image_hash, variant):
+    """Returns the cached text for an image variant ('original' / 'augmented'), or None."""
+    with cache_lock:
+        return result_cache.get((image_hash, variant))
+
+def cache_put(image_hash, variant, text):
+    """Remembers the formatted text of an image variant."""
+    with cache_lock:
+        result_cache[(image_hash, variant)] = text
+
+def allowed_bytes(head):
+    """Checks whether the uploaded bytes start like a JPEG or PNG file."""
+    return head.startswith(JPEG_SIGNATURE) or head.startswith(PNG_SIGNATURE)
+
+def iter_multipart_files(stream, boundary, field_name):
+    """
+    Parses a multipart/form-data body incrementally and yields (filename, bytes) for each
+    file of `field_name` as soon as that part has arrived. Unlike request.files, this
+    doesn't wait for the whole body before handing out the first file.
+    """
+    decoder = MultipartDecoder(boundary.encode('latin-1'))
+    filename, chunks = None, None
+    while True:
+        event = decoder.next_event()
+        if isinstance(event, NeedData):
+            decoder.receive_data(stream.read(UPLOAD_CHUNK_SIZE) or None)
+        elif isinstance(event, File):
+            filename, chunks = (event.filename, []) if event.name == field_name else (None, None)
+        elif isinstance(event, Field):
+            filename, chunks = None, None
+        elif isinstance(event, Data) and chunks is not None:
+            chunks.append(event.data)
+            if not event.more_data:
+                yield filename, b''.join(chunks)
+                filename, chunks = None, None
+        elif isinstance(event, Epilogue):
+            return
+
+_UPLOADS_DONE = object()
+
+def stream_uploads(field_name, variants, decode):
+    """
+    Receives the files of a batch upload on a background thread and yields them in upload
+    order as (filename, image_hash, cached_texts, future), while later files are still arriving:
+    - image_hash is None when the bytes are not a JPEG/PNG image;
+    - cached_texts holds the cached text of every variant when all of them are cached;
+    - otherwise `future` resolves to decode(bytes), started as soon as the file arrived.
+    Yields nothing if the request is not multipart/form-data.
+    """
+    boundary = request.mimetype_params.get('boundary')
+    if request.mimetype != 'multipart/form-data' or not boundary:
+        return
+    parts = iter_multipart_files(request.stream, boundary, field_name)
+    received = queue.Queue(maxsize=UPLOAD_QUEUE_SIZE)
+    stop = threading.Event()
+
+    def put(item):
+        # Give up once the consumer has gone away (e.g. OCR failed) instead of blocking forever
+        while not stop.is_set():
+            try:
+                received.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def receive():
+        try:
+            for filename, data in parts:
+                if not allowed_bytes(data):
+                    item = (filename, None, None, None)
+                else:
+                    image_hash = xxhash.xxh3_64_intdigest(data)
+                    cached_texts = tuple(cache_get(image_hash, variant) for variant in variants)
+                    if None in cached_texts:
+                        item = (filename, image_hash, None, decode_pool.submit(decode, data))
+                    else:
+                        item = (filename, image_hash, cached_texts, None)
+                if not put(item):
+                    return
+            put(_UPLOADS_DONE)
+        except Exception as e:
+            # Malformed or interrupted uploads surface in the request thread
+            put(e)
+
+    threading.Thread(target=receive, daemon=True).start()
+    try:
+        while True:
+            item = received.get()
+            if item is _UPLOADS_DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+def decode_image(data):
+    """
+    Decodes the bytes of an uploaded image straight from memory into a BGR array.
+    Returns None if the upload is empty or not a readable image.
+    """
+    if not data:
+        return None
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+def binarize_image(img):
+    """
+    Builds the "augmented" variant of an image: grayscale + Otsu threshold,
+    returned as 3 channels since the OCR model expects BGR input.
+    The grayscale pass and the threshold both work in a pooled scratch buffer;
+    only the returned BGR image is newly allocated.
+    """
+    # Both steps run on OpenCV's SIMD code paths (histogram + between-class variance for Otsu).
+    # The image stays on the host on purpose: PaddleOCR only accepts NumPy input, so doing this
+    # on the GPU would add a device round trip for a single memory-bound pass.
+    height, width = img.shape[:2]
+    try:
+        scratch = gray_buffers.get_nowait()
+    except queue.Empty:
+        scratch = np.empty(0, dtype=np.uint8)
+    if scratch.size < height * width:
+        scratch = np.empty(height * width, dtype=np.uint8)
+    try:
+        gray = scratch[:height * width].reshape(height, width)
+        cv2.cvtColor(img, cv2.COLOR_BGR2GRAY, dst=gray)
+        cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU, dst=gray)
+        return cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+    finally:
+        if scratch.size <= GRAY_BUFFER_MAX_PIXELS:
+            gray_buffers.put(scratch)
+
+def decode_augmented_pair(data):
+    """Decodes an upload and prepares its augmented variant. Returns (None, None) if undecodable."""
+    img = decode_image(data)
+    if img is None:
+        return None, None
+    return img, binarize_image(img)
+
+def crop_text_region(img, box):
+    """
+    Cuts a detected (possibly rotated) text box out of the image and warps it
+    into an upright rectangle, the same way PaddleOCR does before recognition.
+    """
+    points = np.array(box, dtype=np.float32)
+    width = int(max(np.linalg.norm(points[0] - points[1]), np.linalg.norm(points[2] - points[3])))
+    height = int(max(np.linalg.norm(points[0] - points[3]), np.linalg.norm(points[1] - points[2])))
+    width, height = max(width, 1), max(height, 1)
+    target = np.float32([[0, 0], [width, 0], [width, height], [0, height]])
+    matrix = cv2.getPerspectiveTransform(points, target)
+    crop = cv2.warpPerspective(img, matrix, (width, height),
+                               borderMode=cv2.BORDER_REPLICATE, flags=cv2.INTER_CUBIC)
+    # Tall boxes hold vertical text; rotate them so they read left to right
+    if height / width >= 1.5:
+        crop = np.rot90(crop)
+    return crop
+
+def fit_to_width_bucket(crop):
+    """
+    Scales a text crop to the recognizer height and pads it on the right up to the
+    nearest width bucket. Returns (bucket width, crop); crops that would be wider than
+    the largest bucket are narrowed to it.
+    """
+    h, w = crop.shape[:2]
+    scaled_width = min(max(1, int(np.ceil(REC_IMAGE_HEIGHT * w / h))), REC_WIDTH_BUCKETS[-1])
+    crop = cv2.resize(crop, (scaled_width, REC_IMAGE_HEIGHT))
+    bucket = next(bucket for bucket in REC_WIDTH_BUCKETS if scaled_width <= bucket)
+    # Mid-gray becomes 0 after the recognizer's normalization, the same value it pads with
+    return bucket, cv2.copyMakeBorder(crop, 0, 0, 0, bucket - scaled_width,
+                                      cv2.BORDER_CONSTANT, value=(128, 128, 128))
+
+def ocr_images(images):
+    """
+    Runs OCR on several decoded images in one go.
+    Text boxes are detected image by image, then the crops of *all* images are
+    recognized together so the recognizer runs full batches instead of one
+    small batch per image. With several engines, detections and recognition
+    buckets are spread over them. Returns one PaddleOCR-style result per image.
+    `images` may be a lazy iterable; entries that are None (undecodable uploads)
+    get None as their result, and an image whose detection fails gets the exception
+    instead, so one bad file doesn't fail the others.
+    """
+    def detect_and_crop(img):
+        boxes = detect_text_boxes(img)
+        return boxes, [crop_text_region(img, box) for box in boxes]
+
+    boxes_per_image = []
+    crops = []
+
+    def collect(detection):
+        if detection is None:
+            boxes_per_image.append(None)
+            return
+        try:
+            boxes, image_crops = detection.result()
+        except Exception as e:
+            boxes_per_image.append(e)
+            return
+        boxes_per_image.append(boxes)
+        crops.extend(image_crops)
+
+    # Start detecting each image as soon as it is available, but only pull the next one
+    # from `images` once fewer than DETECTIONS_IN_FLIGHT are waiting for an engine
+    detections = collections.deque()
+    for img in images:
+        detections.append(None if img is None else inference_pool.submit(detect_and_crop, img))
+        if len(detections) >= DETECTIONS_IN_FLIGHT:
+            collect(detections.popleft())
+    while detections:
+        collect(detections.popleft())
+
+    # Group the crops by width bucket so each recognition call sees a single input shape
+    buckets = {}
+    for index, crop in enumerate(crops):
+        bucket, fitted = fit_to_width_bucket(crop)
+        buckets.setdefault(bucket, []).append((index, fitted))
+
+    # Recognition only: PaddleOCR feeds the crops of a bucket in chunks of rec_batch_num
+    bucket_futures = [(members, inference_pool.submit(run_model, [crop for _, crop in members], det=False))
+                      for members in buckets.values()]
+    recognized = [None] * len(crops)
+    for members, future in bucket_futures:
+        for (index, _), rec in zip(members, future.result()[0]):
+            recognized[index] = rec
+
+    # Scatter the recognized text back to the image it came from
+    results = []
+    offset = 0
+    for boxes in boxes_per_image:
+        if boxes is None or isinstance(boxes, Exception):
+            results.append(boxes)
+            continue
+        page = []
+        for box, (text, score) in zip(boxes, recognized[offset:offset + len(boxes)]):
+            if score >= ocr_engines[0].drop_score:
+                page.append([box, (text, score)])
+        offset += len(boxes)
+        results.append([page])
+    return results
 
 def process_ocr_result(result):
     """
@@ -40,50 +454,67 @@ def process_ocr_result(result):
     This logic is an improved version of the one in the notebook, sorting text
     first by vertical position and then by horizontal position to reconstruct lines correctly.
     """
-    if not result or not result[0]:
+    # The result from paddleocr is wrapped in a list, so we access result[0];
+    # an empty page comes back as [None] (or [[]])
+    page = result[0] if result else None
+    if not page:
         return "No text found."
 
-    text_coordinates = []
-    # The result from paddleocr is wrapped in a list, so we access result[0]
-    for item in result[0]:
-        # item: [bounding_box, (text, confidence_score)]
-        box = item[0]
-        text = item[1][0]
-        
-        # Calculate the middle y-coordinate and starting x-coordinate of the text box
-        y_coord = (box[0][1] + box[2][1]) / 2
-        x_coord = box[0][0]
-        
-        text_coordinates.append({'text': text, 'y': y_coord, 'x': x_coord})
+    # item: [bounding_box, (text, confidence_score)]
+    texts = [None] * len(page)
+    boxes = np.empty((len(page), 4, 2), dtype=np.float32)
+    for i, item in enumerate(page):
+        boxes[i] = item[0]
+        texts[i] = item[1][0]
+
+    # Middle y-coordinate and starting x-coordinate of every text box
+    ys = (boxes[:, 0, 1] + boxes[:, 2, 1]) * 0.5
+    xs = boxes[:, 0, 0]
 
     # Sort items primarily by their vertical position (y), and secondarily by horizontal (x)
-    text_coordinates.sort(key=lambda item: (item['y'], item['x']))
-    
-    # Group text items into lines based on vertical proximity
-    line_threshold = 18  # Threshold to determine if text is on the same line
-    formatted_lines = []
-    if not text_coordinates:
-        return ""
-
-    current_line = [text_coordinates[0]]
-    for i in range(1, len(text_coordinates)):
-        prev_item = current_line[-1]
-        current_item = text_coordinates[i]
-        
-        if abs(current_item['y'] - prev_item['y']) <= line_threshold:
-            current_line.append(current_item)
-        else:
-            current_line.sort(key=lambda x: x['x'])
-            formatted_lines.append(' '.join([item['text'] for item in current_line]))
-            current_line = [current_item]
-            
-    if current_line:
-        current_line.sort(key=lambda x: x['x'])
-        formatted_lines.append(' '.join([item['text'] for item in current_line]))
+    order = np.lexsort((xs, ys))
+    ys, xs = ys[order], xs[order]
+
+    # Group text items into lines based on vertical proximity: a new line starts wherever
+    # the gap to the previous item exceeds half the typical text height on the page
+    heights = np.abs(boxes[:, 2, 1] - boxes[:, 0, 1])
+    line_threshold = max(0.5 * float(np.median(heights)), 1.0)
+    line_ids = np.concatenate(([0], np.cumsum(np.diff(ys) > line_threshold)))
+
+    # Within a line, read left to right: one stable sort by (line, x) orders the whole page
+    reading_order = order[np.lexsort((xs, line_ids))]
+    ordered_texts = [texts[i] for i in reading_order]
+    bounds = [0, *(np.flatnonzero(np.diff(line_ids)) + 1).tolist(), len(ordered_texts)]
+    formatted_lines = [' '.join(ordered_texts[start:end]) for start, end in zip(bounds, bounds[1:])]
 
     return '\n'.join(formatted_lines)
 
 
+class UnreadableImageError(ValueError):
+    """Raised when uploaded bytes can't be decoded into an image."""
+
+def run_ocr(img_bytes):
+    """
+    Runs the whole single-image pipeline in memory: decode the uploaded bytes, OCR the
+    array and format the text. Results are cached by content.
+    Raises UnreadableImageError if the bytes aren't a readable image.
+    """
+    image_hash = xxhash.xxh3_64_intdigest(img_bytes)
+    cached_text = cache_get(image_hash, 'original')
+    if cached_text is not None:
+        return cached_text
+
+    img = decode_image(img_bytes)
+    if img is None:
+        raise UnreadableImageError('Could not decode image')
+    result = ocr_images([img])[0]
+    if isinstance(result, Exception):
+        raise result
+    formatted_text = process_ocr_result(result)
+    cache_put(image_hash, 'original', formatted_text)
+    return formatted_text
+
+
 # --- Flask Routes ---
 @app.route('/')
 def index():
@@ -92,112 +523,121 @@ def index():
 
 @app.route('/ocr-batch', methods=['POST'])
 def upload_and_ocr_batch():
-    """Handles multiple file uploads and performs OCR on each."""
-    if 'files' not in request.files:
+    """
+    Handles multiple file uploads and performs OCR on each.
+    Files are read from the request as they arrive, so OCR starts before the upload finishes.
+    """
+    results = []
+    filenames = []
+    pending = []  # (position in results, image hash) of the files that go through OCR, in upload order
+
+    def images_to_ocr():
+        for filename, image_hash, cached_texts, future in stream_uploads('files', ('original',), decode_image):
+            filenames.append(filename)
+            if image_hash is None:
+                results.append({'filename': filename or 'Unknown','text': '','status': 'error','error': 'File type not allowed'})
+            elif cached_texts is not None:
+                results.append({'filename': filename,'text': cached_texts[0],'status': 'success'})
+            else:
+                results.append({'filename': filename,'text': '','status': 'success'})
+                pending.append((len(results) - 1, image_hash))
+                yield future.result()
+
+    images = images_to_ocr()
+    try:
+        # Images are detected in upload order as soon as they are decoded;
+        # all files share the recognition batches
+        ocr_results = ocr_images(images)
+        for (index, image_hash), result in zip(pending, ocr_results):
+            if result is None:
+                results[index].update({'status': 'error', 'error': 'Could not decode image'})
+            elif isinstance(result, Exception):
+                results[index].update({'status': 'error', 'error': str(result)})
+            else:
+                results[index]['text'] = process_ocr_result(result)
+                cache_put(image_hash, 'original', results[index]['text'])
+    except Exception as e:
+        # Only the shared recognition pass gets here; it covers every file, so they all fail
+        for index, _ in pending:
+            results[index].update({'status': 'error', 'error': str(e)})
+    finally:
+        images.close()
+
+    if not filenames:
         return jsonify({'error': 'No files part in the request'}), 400
-    
-    files = request.files.getlist('files')
-    
-    if not files or all(file.filename == '' for file in files):
+    if not any(filenames):
         return jsonify({'error': 'No files selected for uploading'}), 400
-    
-    results = []
-    
-    if not os.path.exists(app.config['UPLOAD_FOLDER']):
-        os.makedirs(app.config['UPLOAD_FOLDER'])
-    
-    for file in files:
-        if file and allowed_file(file.filename):
-            unique_filename = f"{uuid.uuid4()}_{file.filename}"
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-            
-            try:
-                file.save(filepath)
-                result = ocr_model.ocr(filepath, cls=False)
-                formatted_text = process_ocr_result(result)
-                
-                results.append({
-                    'filename': file.filename,
-                    'text': formatted_text,
-                    'status': 'success'
-                })
-                
-            except Exception as e:
-                results.append({'filename': file.filename,'text': '','status': 'error','error': str(e)})
-            finally:
-                if os.path.exists(filepath):
-                    os.remove(filepath)
-        else:
-            results.append({'filename': file.filename if file else 'Unknown','text': '','status': 'error','error': 'File type not allowed'})
-    
+
     return jsonify({'results': results})
 
+def augmented_response(original_text, augmented_text):
+    """Builds the per-file fields the UI shows for an augmented OCR result."""
+    return {
+        'text': augmented_text,          # The "Enhanced Combined Text" is from our augmented image
+        'original_text': original_text,  # The "Original Image Text"
+        'variants': [                    # Populate variants for the UI
+            {'name': 'Original', 'word_count': len(original_text.split())},
+            {'name': 'Grayscale + Threshold', 'word_count': len(augmented_text.split())}
+        ]
+    }
+
 # --- Route for "Augmented OCR" button ---
 @app.route('/ocr-batch-augmented', methods=['POST'])
 def upload_and_ocr_batch_augmented():
     """
     Handles "augmented" OCR by applying image preprocessing with OpenCV
     before running the OCR, providing a potentially different/better result.
+    Like /ocr-batch, files are processed while the upload is still arriving.
     """
-    if 'files' not in request.files:
-        return jsonify({'error': 'No files part in the request'}), 400
-
-    files = request.files.getlist('files')
-
-    if not files or all(file.filename == '' for file in files):
-        return jsonify({'error': 'No files selected for uploading'}), 400
-
     results = []
+    filenames = []
+    pending = []  # (position in results, image hash) of the files that go through OCR, in upload order
 
-    if not os.path.exists(app.config['UPLOAD_FOLDER']):
-        os.makedirs(app.config['UPLOAD_FOLDER'])
+    def images_to_ocr():
+        # Thresholding is deterministic, so the raw bytes identify the augmented variant too
+        uploads = stream_uploads('files', ('original', 'augmented'), decode_augmented_pair)
+        for filename, image_hash, cached_texts, future in uploads:
+            filenames.append(filename)
+            if image_hash is None:
+                results.append({'filename': filename or 'Unknown','text': '','status': 'error','error': 'File type not allowed'})
+            elif cached_texts is not None:
+                results.append({'filename': filename,'status': 'success', **augmented_response(*cached_texts)})
+            else:
+                results.append({'filename': filename,'text': '','status': 'success'})
+                pending.append((len(results) - 1, image_hash))
+                # Decoding and thresholding ran in the background; hand over (original, augmented)
+                yield from future.result()
 
-    for file in files:
-        if file and allowed_file(file.filename):
-            unique_filename = f"{uuid.uuid4()}_{file.filename}"
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
+    images = images_to_ocr()
+    try:
+        # Original and augmented images of every file go through one OCR submission,
+        # so both variants share the recognition batches
+        ocr_results = ocr_images(images)
+        for position, (index, image_hash) in enumerate(pending):
+            original_result, augmented_result = ocr_results[2 * position:2 * position + 2]
+            if original_result is None:
+                results[index].update({'status': 'error', 'error': 'Could not decode image'})
+                continue
+            failed = next((r for r in (original_result, augmented_result) if isinstance(r, Exception)), None)
+            if failed is not None:
+                results[index].update({'status': 'error', 'error': str(failed)})
+                continue
+            original_text = process_ocr_result(original_result)
+            augmented_text = process_ocr_result(augmented_result)
+            cache_put(image_hash, 'original', original_text)
+            cache_put(image_hash, 'augmented', augmented_text)
+            results[index].update(augmented_response(original_text, augmented_text))
+    except Exception as e:
+        # Only the shared recognition pass gets here; it covers every file, so they all fail
+        for index, _ in pending:
+            results[index].update({'status': 'error', 'error': str(e)})
+    finally:
+        images.close()
 
-            try:
-                file.save(filepath)
-
-                # --- START OF AUGMENTATION LOGIC ---
-                
-                # 1. Run OCR on the original image first
-                original_result = ocr_model.ocr(filepath, cls=False)
-                original_text = process_ocr_result(original_result)
-
-                # 2. Preprocess the image using OpenCV for the "augmented" version
-                img = cv2.imread(filepath)
-                # Convert to grayscale
-                gray_img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-                # Apply a binary threshold to get a black and white image
-                _, augmented_img = cv2.threshold(gray_img, 128, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
-
-                # 3. Run OCR on the processed NumPy array
-                # PaddleOCR can take an image path or a NumPy array
-                augmented_result = ocr_model.ocr(augmented_img, cls=False)
-                augmented_text = process_ocr_result(augmented_result)
-                
-                # --- END OF AUGMENTATION LOGIC ---
-
-                results.append({
-                    'filename': file.filename,
-                    'status': 'success',
-                    'text': augmented_text,          # The "Enhanced Combined Text" is from our augmented image
-                    'original_text': original_text,  # The "Original Image Text"
-                    'variants': [                    # Populate variants for the UI
-                        {'name': 'Original', 'word_count': len(original_text.split())},
-                        {'name': 'Grayscale + Threshold', 'word_count': len(augmented_text.split())}
-                    ]
-                })
-
-            except Exception as e:
-                results.append({'filename': file.filename,'text': '','status': 'error','error': str(e)})
-            finally:
-                if os.path.exists(filepath):
-                    os.remove(filepath)
-        else:
-            results.append({'filename': file.filename if file else 'Unknown','text': '','status': 'error','error': 'File type not allowed'})
+    if not filenames:
+        return jsonify({'error': 'No files part in the request'}), 400
+    if not any(filenames):
+        return jsonify({'error': 'No files selected for uploading'}), 400
 
     return jsonify({'results': results})
 
@@ -214,26 +654,18 @@ def upload_and_ocr():
     if file.filename == '':
         return jsonify({'error': 'No file selected for uploading'}), 400
         
-    if file and allowed_file(file.filename):
-        if not os.path.exists(app.config['UPLOAD_FOLDER']):
-            os.makedirs(app.config['UPLOAD_FOLDER'])
-            
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], file.filename)
-        file.save(filepath)
-        
+    data = file.read()
+    if allowed_bytes(data):
         try:
-            result = ocr_model.ocr(filepath, cls=False)
-            formatted_text = process_ocr_result(result)
-            return jsonify({'text': formatted_text})
-            
+            return jsonify({'text': run_ocr(data)})
+        except UnreadableImageError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': f'An error occurred during OCR processing: {str(e)}'}), 500
-        finally:
-            if os.path.exists(filepath):
-                os.remove(filepath)
     else:
         return jsonify({'error': 'File type not allowed'}), 400
 
 # --- Main Execution ---
+# Development server only; in production run `gunicorn -c gunicorn.conf.py app:app`
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5001, debug=True)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=5001, debug=DEBUG)
\ No newline at end of file
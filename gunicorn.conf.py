@@ -0,0 +1,42 @@
+# /paddle-ocr-webapp/gunicorn.conf.py
+# Production server settings. Start with:  gunicorn -c gunicorn.conf.py app:app
+
+import itertools
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5001')
+
+# Every worker loads its own PaddleOCR model. On a single GPU, start the CUDA MPS daemon
+# (`nvidia-cuda-mps-control -d`) first so the workers share one GPU context and their kernels overlap.
+workers = int(os.environ.get('GUNICORN_WORKERS', '4'))
+
+# gthread: extra threads receive uploads and decode images while another request holds the model.
+# For CPU-only deployments `gevent` works as well (pip install gevent).
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', '2'))
+
+# Load the app inside each worker, never in the master, so PaddleOCR is initialized once per worker.
+preload_app = False
+
+# Model downloads and first-run engine builds can take a while.
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '300'))
+
+
+# MKL-DNN / OpenMP threads are pinned to cores (KMP_AFFINITY in app.py). Give every worker its own
+# slice of the cores and size its thread pool to that slice, so the workers' threads don't pile up
+# on the same cores.
+def pre_fork(server, worker):
+    # Runs in the master: hand the new worker the lowest core slice no live worker is using
+    taken = {getattr(w, 'cpu_slot', None) for w in server.WORKERS.values()}
+    worker.cpu_slot = next(slot for slot in itertools.count() if slot not in taken)
+
+def post_fork(server, worker):
+    # Runs in the worker before app.py is imported
+    cores = sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else list(range(os.cpu_count() or 1))
+    # The live worker count: -w on the command line and TTIN/TTOU signals change it, not `workers` above
+    share = max(1, len(cores) // server.num_workers)
+    start = (worker.cpu_slot * share) % len(cores)
+    worker_cores = cores[start:start + share]
+    if hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, worker_cores)
+    os.environ.setdefault('OMP_NUM_THREADS', str(len(worker_cores)))
@@ -0,0 +1,33 @@
+# /paddle-ocr-webapp/tests/conftest.py
+# The upload tests exercise the Flask routes, not the models: app.py is imported with a small
+# stand-in for paddle / PaddleOCR so they run in seconds and without a GPU or model downloads.
+
+import os
+import sys
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TEXT_BOX = [[0, 0], [40, 0], [40, 10], [0, 10]]
+
+
+class FakePaddleOCR:
+    """Finds one text box on every image and reads every crop as 'text'."""
+    drop_score = 0.5
+
+    def __init__(self, **kwargs):
+        self.options = kwargs
+
+    def ocr(self, img, det=True, rec=True, cls=True):
+        if not det:
+            return [[('text', 0.99)] * len(img)]
+        return [[TEXT_BOX]]
+
+
+paddle = types.ModuleType('paddle')
+paddle.device = types.SimpleNamespace(is_compiled_with_cuda=lambda: False,
+                                      cuda=types.SimpleNamespace(device_count=lambda: 0))
+paddleocr = types.ModuleType('paddleocr')
+paddleocr.PaddleOCR = FakePaddleOCR
+sys.modules['paddle'] = paddle
+sys.modules['paddleocr'] = paddleocr
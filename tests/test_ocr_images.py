@@ -0,0 +1,44 @@
+# /paddle-ocr-webapp/tests/test_ocr_images.py
+
+import time
+
+import numpy as np
+
+import app as webapp
+
+
+def test_images_are_pulled_as_detections_finish(monkeypatch):
+    detected = []
+
+    def slow_detect(img):
+        time.sleep(0.01)
+        detected.append(img)
+        return [[[0, 0], [40, 0], [40, 10], [0, 10]]]
+
+    def images():
+        for pulled in range(10):
+            # Every image beyond the window has to wait for an earlier detection to finish
+            assert pulled - len(detected) <= webapp.DETECTIONS_IN_FLIGHT
+            yield np.zeros((20, 60, 3), dtype=np.uint8)
+
+    monkeypatch.setattr(webapp, 'detect_text_boxes', slow_detect)
+    results = webapp.ocr_images(images())
+    assert len(results) == 10 and all(result[0][0][1][0] == 'text' for result in results)
+
+
+def test_every_crop_gets_a_width_bucket():
+    # Short words, full-width document lines and a line longer than the largest bucket
+    for height, width, bucket in [(40, 60, 320), (40, 900, 1280), (40, 1500, 2400), (50, 2000, 2400),
+                                  (20, 4000, 3200)]:
+        fitted_bucket, fitted = webapp.fit_to_width_bucket(np.zeros((height, width, 3), dtype=np.uint8))
+        assert fitted_bucket == bucket
+        assert fitted.shape == (webapp.REC_IMAGE_HEIGHT, bucket, 3)
+
+
+def test_oversized_gray_buffers_are_not_pooled(monkeypatch):
+    monkeypatch.setattr(webapp, 'gray_buffers', webapp.queue.SimpleQueue())
+    monkeypatch.setattr(webapp, 'GRAY_BUFFER_MAX_PIXELS', 100 * 100)
+    webapp.binarize_image(np.zeros((120, 120, 3), dtype=np.uint8))
+    assert webapp.gray_buffers.empty()
+    binary = webapp.binarize_image(np.zeros((50, 80, 3), dtype=np.uint8))
+    assert binary.shape == (50, 80, 3) and webapp.gray_buffers.qsize() == 1
@@ -0,0 +1,34 @@
+# /paddle-ocr-webapp/tests/test_process_ocr_result.py
+
+import pytest
+
+import app as webapp
+
+
+def item(text, x, y, width=40, height=20):
+    """A PaddleOCR result item: [box (clockwise from top-left), (text, score)]."""
+    box = [[x, y], [x + width, y], [x + width, y + height], [x, y + height]]
+    return [box, (text, 0.99)]
+
+
+@pytest.mark.parametrize('result', [None, [], [None], [[]]])
+def test_empty_results(result):
+    assert webapp.process_ocr_result(result) == "No text found."
+
+
+def test_lines_are_read_top_to_bottom_and_left_to_right():
+    page = [item('world', 60, 12), item('Hello', 0, 10), item('line', 60, 52), item('Second', 0, 50),
+            item('!', 120, 14)]
+    assert webapp.process_ocr_result([page]) == "Hello world !\nSecond line"
+
+
+def test_line_threshold_follows_the_text_height():
+    # Boxes 8 px apart share a line when the text is 20 px high, but not when it is 10 px high
+    tall = [item('a', 0, 0), item('b', 50, 8)]
+    short = [item('a', 0, 0, height=10), item('b', 50, 8, height=10)]
+    assert webapp.process_ocr_result([tall]) == "a b"
+    assert webapp.process_ocr_result([short]) == "a\nb"
+
+
+def test_single_item():
+    assert webapp.process_ocr_result([[item('only', 5, 5)]]) == "only"
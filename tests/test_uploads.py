@@ -0,0 +1,106 @@
+# /paddle-ocr-webapp/tests/test_uploads.py
+# Batch uploads are parsed straight off the request stream (iter_multipart_files / stream_uploads).
+
+from io import BytesIO
+
+import cv2
+import numpy as np
+import pytest
+
+import app as webapp
+
+BOUNDARY = 'test-boundary'
+
+
+def png_bytes(seed):
+    """A small PNG; the seed makes every file's content (and cache key) distinct."""
+    img = np.full((20, 60, 3), seed % 256, dtype=np.uint8)
+    return cv2.imencode('.png', img)[1].tobytes()
+
+
+def multipart_body(*parts):
+    """Builds a multipart/form-data body from (name, filename or None, bytes) parts."""
+    body = b''
+    for name, filename, data in parts:
+        disposition = f'form-data; name="{name}"'
+        if filename is not None:
+            disposition += f'; filename="{filename}"'
+        body += f'--{BOUNDARY}\r\nContent-Disposition: {disposition}\r\n\r\n'.encode() + data + b'\r\n'
+    return body + f'--{BOUNDARY}--\r\n'.encode()
+
+
+@pytest.fixture
+def client():
+    webapp.result_cache.clear()
+    return webapp.app.test_client()
+
+
+def post(client, route, body):
+    return client.post(route, data=body, content_type=f'multipart/form-data; boundary={BOUNDARY}')
+
+
+@pytest.mark.parametrize('route', ['/ocr-batch', '/ocr-batch-augmented'])
+def test_files_are_processed_in_upload_order(client, route):
+    body = multipart_body(('files', 'a.png', png_bytes(1)), ('files', 'b.png', png_bytes(2)))
+    response = post(client, route, body)
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert [r['filename'] for r in results] == ['a.png', 'b.png']
+    assert all(r['status'] == 'success' and r['text'] == 'text' for r in results)
+
+
+def test_large_file_spanning_several_reads(client):
+    data = png_bytes(3) + bytes(3 * webapp.UPLOAD_CHUNK_SIZE)  # trailing bytes after IEND are ignored
+    response = post(client, '/ocr-batch', multipart_body(('files', 'big.png', data)))
+    assert response.get_json()['results'][0]['text'] == 'text'
+
+
+def test_non_file_fields_and_other_file_fields_are_skipped(client):
+    body = multipart_body(('note', None, b'not a file'), ('files', 'a.png', png_bytes(4)),
+                          ('other', 'c.png', png_bytes(5)))
+    results = post(client, '/ocr-batch', body).get_json()['results']
+    assert [r['filename'] for r in results] == ['a.png']
+
+
+def test_disallowed_and_empty_files_fail_individually(client):
+    body = multipart_body(('files', 'notes.txt', b'plain text'), ('files', 'empty.png', b''),
+                          ('files', 'a.png', png_bytes(6)))
+    results = post(client, '/ocr-batch', body).get_json()['results']
+    assert [r['status'] for r in results] == ['error', 'error', 'success']
+    assert results[0]['error'] == 'File type not allowed'
+
+
+@pytest.mark.parametrize('route', ['/ocr-batch', '/ocr-batch-augmented'])
+def test_no_files_part(client, route):
+    response = post(client, route, multipart_body(('note', None, b'no files here')))
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'No files part in the request'
+
+
+def test_not_multipart(client):
+    response = client.post('/ocr-batch', data=b'{}', content_type='application/json')
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'No files part in the request'
+
+
+@pytest.mark.parametrize('route', ['/ocr-batch', '/ocr-batch-augmented'])
+def test_no_files_selected(client, route):
+    # Browsers send an empty, unnamed part when the file input is left empty
+    response = post(client, route, multipart_body(('files', '', b'')))
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'No files selected for uploading'
+
+
+def test_truncated_body_fails_the_files_still_pending(client):
+    body = multipart_body(('files', 'a.png', png_bytes(7)), ('files', 'b.png', png_bytes(8)))
+    response = post(client, '/ocr-batch', body[:len(body) - 200])
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert [r['filename'] for r in results] == ['a.png']
+    assert results[0]['status'] == 'error'
+
+
+def test_truncated_body_before_any_file(client):
+    body = multipart_body(('files', 'a.png', png_bytes(9)))
+    response = post(client, '/ocr-batch', body[:40])
+    assert response.status_code == 400